@@ -6,7 +6,7 @@
 """
 
 import time
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, FrozenSet, Tuple, Type
 
 from backend.models.schema import LLMProvider, LLMResponse
 from backend.ai_service.prompt_templates import get_prompt_manager
@@ -19,13 +19,22 @@ from backend.ai_service.clients.claude_client import ClaudeClient
 from backend.ai_service.clients.qwen_client import QwenClient
 from backend.ai_service.clients.deepseek_client import DeepSeekClient
 
+# 提供商与客户端类的映射
+_PROVIDER_REGISTRY: Dict[LLMProvider, Type[BaseLLMClient]] = {
+    LLMProvider.OPENAI: OpenAIClient,
+    LLMProvider.CLAUDE: ClaudeClient,
+    LLMProvider.QWEN: QwenClient,
+    LLMProvider.DEEPSEEK: DeepSeekClient,
+}
+
 class LLMClientFactory:
     """LLM客户端工厂"""
     
-    _clients: Dict[LLMProvider, BaseLLMClient] = {}
+    _clients: Dict[Tuple[LLMProvider, str, Optional[str]], BaseLLMClient] = {}
     
     @classmethod
-    def create_client(cls, provider: LLMProvider, api_key: str, base_url: Optional[str] = None, **kwargs) -> BaseLLMClient:
+    def create_client(cls, provider: LLMProvider, api_key: str, base_url: Optional[str] = None,
+                      **kwargs: Any) -> BaseLLMClient:
         """
         创建LLM客户端
         
@@ -38,20 +47,14 @@ class LLMClientFactory:
         Returns:
             BaseLLMClient: 客户端实例
         """
-        if provider == LLMProvider.OPENAI:
-            return OpenAIClient(api_key=api_key, base_url=base_url, **kwargs)
-        elif provider == LLMProvider.CLAUDE:
-            return ClaudeClient(api_key=api_key, base_url=base_url, **kwargs)
-        elif provider == LLMProvider.QWEN:
-            return QwenClient(api_key=api_key, base_url=base_url, **kwargs)
-        elif provider == LLMProvider.DEEPSEEK:
-            return DeepSeekClient(api_key=api_key, base_url=base_url, **kwargs)
-        else:
+        client_class = _PROVIDER_REGISTRY.get(provider)
+        if client_class is None:
             raise ValueError(f"不支持的提供商: {provider}")
+        return client_class(api_key=api_key, base_url=base_url, **kwargs)
     
     @classmethod
     def get_or_create_client(cls, provider: LLMProvider, api_key: str, 
-                           base_url: Optional[str] = None, **kwargs) -> BaseLLMClient:
+                           base_url: Optional[str] = None, **kwargs: Any) -> BaseLLMClient:
         """
         获取或创建客户端（带缓存）
         
@@ -65,7 +68,7 @@ class LLMClientFactory:
             BaseLLMClient: 客户端实例
         """
         # 创建缓存key，包含provider和关键配置
-        cache_key = f"{provider.value}_{hash((api_key, base_url))}"
+        cache_key = (provider, api_key, base_url)
         
         if cache_key not in cls._clients:
             cls._clients[cache_key] = cls.create_client(provider, api_key, base_url, **kwargs)
@@ -73,40 +76,38 @@ class LLMClientFactory:
         return cls._clients[cache_key]
     
     @classmethod
-    def clear_cache(cls):
+    def clear_cache(cls) -> None:
         """清除客户端缓存"""
         cls._clients.clear()
     
     @classmethod
     def get_supported_providers(cls) -> List[LLMProvider]:
         """获取支持的提供商列表"""
-        return [
-            LLMProvider.OPENAI,
-            LLMProvider.CLAUDE,
-            LLMProvider.QWEN,
-            LLMProvider.DEEPSEEK
-        ]
+        return list(_PROVIDER_REGISTRY)
 
 class LLMManager:
     """LLM管理器 - 统一管理所有LLM客户端"""
     
-    def __init__(self):
+    def __init__(self) -> None:
         """初始化LLM管理器"""
         self.config_manager = get_config_manager()
         self.prompt_manager = get_prompt_manager()
         
+        # 支持的提供商集合，构建一次用于快速成员判断
+        self._available: FrozenSet[LLMProvider] = frozenset(_PROVIDER_REGISTRY)
+        
         # 从配置管理器加载API密钥
         self.api_keys: Dict[LLMProvider, str] = {}
         self._load_api_keys_from_config()
     
-    def _load_api_keys_from_config(self):
+    def _load_api_keys_from_config(self) -> None:
         """从配置管理器加载API密钥"""
         for provider in LLMProvider:
             api_key = self.config_manager.get_api_key(provider)
             if api_key:
                 self.api_keys[provider] = api_key
     
-    def set_api_key(self, provider: LLMProvider, api_key: str):
+    def set_api_key(self, provider: LLMProvider, api_key: str) -> None:
         """
         设置API密钥
         
@@ -128,9 +129,9 @@ class LLMManager:
         """获取默认提供商"""
         return self.config_manager.get_default_provider()
     
-    def get_available_providers(self) -> List[LLMProvider]:
-        """获取可用的提供商列表（包括支持但未配置的）"""
-        return LLMClientFactory.get_supported_providers()
+    def get_available_providers(self) -> FrozenSet[LLMProvider]:
+        """获取可用的提供商集合（包括支持但未配置的）"""
+        return self._available
     
     async def test_connection(self, provider: LLMProvider) -> bool:
         """
@@ -286,7 +287,7 @@ class LLMManager:
         """获取所有提供商信息"""
         return [
             self.get_provider_info(provider) 
-            for provider in self.get_available_providers()
+            for provider in LLMClientFactory.get_supported_providers()
         ]
 
 # 全局LLM管理器实例
@@ -303,7 +304,7 @@ if __name__ == "__main__":
     async def test():
         manager = get_llm_manager()
         
-        print("可用提供商:", [p.value for p in manager.get_available_providers()])
+        print("可用提供商:", [p.value for p in LLMClientFactory.get_supported_providers()])
         print("已配置提供商:", [p.value for p in manager.get_configured_providers()])
         
         # 获取所有提供商信息
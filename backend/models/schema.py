@@ -243,6 +243,8 @@ class LLMResponse(BaseModel):
     full_prompt: Optional[str] = Field(None, description="完整的发送给LLM的提示词")
     
     model_config = {
+        # 响应创建后不再修改，冻结后可安全共享
+        "frozen": True,
         "json_schema_extra": {
             "example": {
                 "success": True,
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pytest全局配置
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import matplotlib
+import matplotlib.pyplot as plt
+import pytest
+
+from backend.models.schema import LLMResponse
+
+# 集成测试所需的API密钥环境变量
+LLM_API_KEY_ENV_VARS = (
+    "OPENAI_API_KEY",
+    "CLAUDE_API_KEY",
+    "QWEN_API_KEY",
+    "DEEPSEEK_API_KEY",
+)
+
+# LLM响应回放缓存目录
+LLM_CACHE_DIR = Path(__file__).parent / ".llm_cache"
+
+
+def pytest_addoption(parser):
+    """注册命令行参数"""
+    parser.addoption(
+        "--refresh-llm-cache",
+        action="store_true",
+        default=False,
+        help="忽略已缓存的LLM响应，重新请求并覆盖缓存"
+    )
+
+
+def pytest_configure(config):
+    """注册自定义标记"""
+    config.addinivalue_line("markers", "integration: 需要真实API密钥的集成测试")
+
+
+def pytest_collection_modifyitems(config, items):
+    """未配置任何LLM密钥时，整体跳过客户端集成测试"""
+    if any(os.getenv(key) for key in LLM_API_KEY_ENV_VARS):
+        return
+
+    skip = pytest.mark.skip(reason="未配置任何LLM API密钥")
+    for item in items:
+        if "TestClientIntegration" in item.nodeid:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _matplotlib_agg():
+    """整个测试会话只设置一次非交互式后端"""
+    matplotlib.use("Agg")
+
+
+@pytest.fixture(autouse=True)
+def _restore_rcparams():
+    """每个测试结束后恢复matplotlib全局配置，避免测试间状态泄漏"""
+    saved = plt.rcParams.copy()
+    yield
+    plt.rcParams.update(saved)
+
+
+@pytest.fixture
+def cached_generate_completion(request):
+    """
+    带磁盘回放缓存的generate_completion
+
+    缓存key由客户端类型、base_url和全部请求参数计算得出，
+    只缓存成功的响应，命中时直接返回，不发起网络请求。
+    """
+    refresh = request.config.getoption("--refresh-llm-cache")
+
+    async def _generate(client, **kwargs) -> LLMResponse:
+        key_data = {
+            "provider": type(client).__name__,
+            "base_url": client.base_url,
+            **kwargs
+        }
+        key = hashlib.blake2b(
+            json.dumps(key_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        cache_file = LLM_CACHE_DIR / f"{key}.json"
+
+        if not refresh and cache_file.is_file():
+            return LLMResponse.model_validate_json(cache_file.read_bytes())
+
+        response = await client.generate_completion(**kwargs)
+        if response.success:
+            LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(response.model_dump_json(), encoding="utf-8")
+        return response
+
+    return _generate
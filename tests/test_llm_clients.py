@@ -100,7 +100,7 @@ class ClientTester:
             results = {}
             
             for test_name, prompt_data in prompts.items():
-                print(f"  📝 测试场景: {test_name}")
+                print(f"  [OpenAI] 📝 测试场景: {test_name}")
                 
                 start_time = time.time()
                 response = await client.generate_completion(
@@ -120,20 +120,20 @@ class ClientTester:
                             "content": content_json,
                             "usage": response.usage_stats
                         }
-                        print(f"    ✅ 成功 ({test_time:.2f}s)")
+                        print(f"    [OpenAI] ✅ 成功 ({test_time:.2f}s)")
                     except json.JSONDecodeError:
                         results[test_name] = {
                             "success": False,
                             "error": "响应不是有效的JSON格式",
                             "raw_content": response.content[:200] + "..."
                         }
-                        print(f"    ⚠️ JSON解析失败")
+                        print(f"    [OpenAI] ⚠️ JSON解析失败")
                 else:
                     results[test_name] = {
                         "success": False,
                         "error": response.error_message
                     }
-                    print(f"    ❌ 失败: {response.error_message}")
+                    print(f"    [OpenAI] ❌ 失败: {response.error_message}")
             
             return {
                 "success": True,
@@ -169,7 +169,7 @@ class ClientTester:
             results = {}
             
             for test_name, prompt_data in prompts.items():
-                print(f"  📝 测试场景: {test_name}")
+                print(f"  [Claude] 📝 测试场景: {test_name}")
                 
                 start_time = time.time()
                 response = await client.generate_completion(
@@ -189,20 +189,20 @@ class ClientTester:
                             "content": content_json,
                             "usage": response.usage_stats
                         }
-                        print(f"    ✅ 成功 ({test_time:.2f}s)")
+                        print(f"    [Claude] ✅ 成功 ({test_time:.2f}s)")
                     except json.JSONDecodeError:
                         results[test_name] = {
                             "success": False,
                             "error": "响应不是有效的JSON格式",
                             "raw_content": response.content[:200] + "..."
                         }
-                        print(f"    ⚠️ JSON解析失败")
+                        print(f"    [Claude] ⚠️ JSON解析失败")
                 else:
                     results[test_name] = {
                         "success": False,
                         "error": response.error_message
                     }
-                    print(f"    ❌ 失败: {response.error_message}")
+                    print(f"    [Claude] ❌ 失败: {response.error_message}")
             
             return {
                 "success": True,
@@ -231,48 +231,53 @@ class ClientTester:
                 print(f"  • {provider}: ❌")
         print()
         
-        # 测试OpenAI客户端
+        # 收集已配置的客户端测试
+        tests = []
         if config_summary["provider_details"]["openai"]["api_key_configured"]:
-            openai_result = await self.test_openai_client()
-            self.test_results["openai"] = openai_result
-            print()
+            tests.append(("openai", self.test_openai_client))
         else:
             print("⏭️ 跳过OpenAI测试（未配置API密钥）\n")
         
-        # 测试Claude客户端
         if config_summary["provider_details"]["claude"]["api_key_configured"]:
-            claude_result = await self.test_claude_client()
-            self.test_results["claude"] = claude_result
-            print()
+            tests.append(("claude", self.test_claude_client))
         else:
             print("⏭️ 跳过Claude测试（未配置API密钥）\n")
         
+        # 各客户端测试互不依赖，并发执行（进度输出带有提供商标记，便于区分交错的行）
+        results = await asyncio.gather(*(test_func() for _, test_func in tests),
+                                       return_exceptions=True)
+        for (provider, _), result in zip(tests, results):
+            if isinstance(result, Exception):
+                result = {"success": False, "error": f"测试异常: {str(result)}"}
+            self.test_results[provider] = result
+        print()
+        
         # 显示测试总结
         self.print_test_summary()
     
     def print_test_summary(self):
-        """打印测试总结"""
-        print("📊 测试总结")
-        print("=" * 50)
+        """打印测试总结（汇总后一次性输出）"""
+        lines = ["📊 测试总结", "=" * 50]
         
         for provider, result in self.test_results.items():
             if result["success"]:
-                print(f"\n🎯 {provider.upper()} 客户端:")
-                print(f"  Base URL: {result['client_info']['base_url']}")
-                print(f"  模型: {result['client_info']['model']}")
+                lines.append(f"\n🎯 {provider.upper()} 客户端:")
+                lines.append(f"  Base URL: {result['client_info']['base_url']}")
+                lines.append(f"  模型: {result['client_info']['model']}")
                 
                 for test_name, test_result in result["test_results"].items():
                     if test_result["success"]:
-                        print(f"  ✅ {test_name}: {test_result['response_time']:.2f}s")
+                        lines.append(f"  ✅ {test_name}: {test_result['response_time']:.2f}s")
                         if "usage" in test_result:
                             usage = test_result["usage"]
-                            print(f"     Token使用: {usage.get('total_tokens', 'N/A')}")
+                            lines.append(f"     Token使用: {usage.get('total_tokens', 'N/A')}")
                     else:
-                        print(f"  ❌ {test_name}: {test_result['error']}")
+                        lines.append(f"  ❌ {test_name}: {test_result['error']}")
             else:
-                print(f"\n❌ {provider.upper()} 客户端: {result['error']}")
+                lines.append(f"\n❌ {provider.upper()} 客户端: {result['error']}")
         
-        print("\n🏁 测试完成！")
+        lines.append("\n🏁 测试完成！")
+        print("\n".join(lines))
 
 async def main():
     """主函数"""
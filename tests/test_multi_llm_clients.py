@@ -7,8 +7,10 @@
 
 import pytest
 import asyncio
+import logging
 import os
 from unittest.mock import patch, MagicMock, AsyncMock
+from hypothesis import given, settings, strategies as st
 
 from backend.ai_service.llm_client import LLMManager, LLMClientFactory
 from backend.ai_service.clients.openai_client import OpenAIClient
@@ -17,63 +19,75 @@ from backend.ai_service.clients.qwen_client import QwenClient
 from backend.ai_service.clients.deepseek_client import DeepSeekClient
 from backend.models.schema import LLMProvider, LLMResponse
 
+log = logging.getLogger(__name__)
+
+# 模拟的API密钥和Base URL配置
+TEST_API_KEYS = {
+    LLMProvider.OPENAI: "test-openai-key",
+    LLMProvider.CLAUDE: "test-claude-key",
+    LLMProvider.QWEN: "test-qwen-key",
+    LLMProvider.DEEPSEEK: "test-deepseek-key",
+}
+
+TEST_BASE_URLS = {
+    LLMProvider.OPENAI: "https://api.moonshot.cn/v1",
+    LLMProvider.QWEN: "https://dashscope.aliyuncs.com/api/v1",
+    LLMProvider.DEEPSEEK: "https://api.deepseek.com/v1",
+}
+
+# 各提供商对应的客户端类
+EXPECTED_CLIENT_CLASSES = {
+    LLMProvider.OPENAI: OpenAIClient,
+    LLMProvider.CLAUDE: ClaudeClient,
+    LLMProvider.QWEN: QwenClient,
+    LLMProvider.DEEPSEEK: DeepSeekClient,
+}
+
+# 集成测试覆盖的提供商：(名称, 客户端类, 环境变量前缀)
+INTEGRATION_PROVIDERS = (
+    ("OpenAI", OpenAIClient, "OPENAI"),
+    ("Claude", ClaudeClient, "CLAUDE"),
+    ("Qwen", QwenClient, "QWEN"),
+    ("DeepSeek", DeepSeekClient, "DEEPSEEK"),
+)
+
+# 模拟的LLM响应（LLMResponse不可变，可在测试间共享）
+MOCK_RESPONSE = LLMResponse(
+    success=True,
+    content="# Generated code",
+    usage_stats={"total_tokens": 100},
+    response_time=1.5,
+    system_prompt="System prompt",
+    user_prompt="User prompt",
+    full_prompt="Full prompt"
+)
+
+def _log_response(name: str, response: LLMResponse):
+    """记录真实请求的响应摘要"""
+    if response.success:
+        log.debug("%s 响应: content=%r usage=%s time=%.2fs", name,
+                  response.content, response.usage_stats, response.response_time)
+    else:
+        log.debug("%s 请求失败: %s", name, response.error_message)
+
 class TestLLMClientFactory:
     """测试LLM客户端工厂"""
     
-    def test_create_openai_client(self):
-        """测试创建OpenAI客户端"""
-        api_key = "test-openai-key"
-        base_url = "https://api.moonshot.cn/v1"
-        
-        client = LLMClientFactory.create_client(
-            provider=LLMProvider.OPENAI,
-            api_key=api_key,
-            base_url=base_url
-        )
-        
-        assert isinstance(client, OpenAIClient)
-        assert client.api_key == api_key
-        assert client.base_url == base_url
-    
-    def test_create_claude_client(self):
-        """测试创建Claude客户端"""
-        api_key = "test-claude-key"
-        
-        client = LLMClientFactory.create_client(
-            provider=LLMProvider.CLAUDE,
-            api_key=api_key
-        )
-        
-        assert isinstance(client, ClaudeClient)
-        assert client.api_key == api_key
-    
-    def test_create_qwen_client(self):
-        """测试创建Qwen客户端"""
-        api_key = "test-qwen-key"
-        base_url = "https://dashscope.aliyuncs.com/api/v1"
-        
-        client = LLMClientFactory.create_client(
-            provider=LLMProvider.QWEN,
-            api_key=api_key,
-            base_url=base_url
-        )
-        
-        assert isinstance(client, QwenClient)
-        assert client.api_key == api_key
-        assert client.base_url == base_url
-    
-    def test_create_deepseek_client(self):
-        """测试创建DeepSeek客户端"""
-        api_key = "test-deepseek-key"
-        base_url = "https://api.deepseek.com/v1"
-        
+    @settings(max_examples=50, deadline=None)
+    @given(
+        provider=st.sampled_from(list(EXPECTED_CLIENT_CLASSES)),
+        api_key=st.text(min_size=8, max_size=64),
+        base_url=st.sampled_from(list(TEST_BASE_URLS.values()))
+    )
+    def test_create_client(self, provider, api_key, base_url):
+        """测试为每个提供商创建客户端"""
         client = LLMClientFactory.create_client(
-            provider=LLMProvider.DEEPSEEK,
+            provider=provider,
             api_key=api_key,
             base_url=base_url
         )
         
-        assert isinstance(client, DeepSeekClient)
+        assert isinstance(client, EXPECTED_CLIENT_CLASSES[provider])
         assert client.api_key == api_key
         assert client.base_url == base_url
     
@@ -102,10 +116,9 @@ class TestLLMClientFactory:
             api_key=api_key
         )
         
-        # 由于缓存key包含api_key的hash，这里应该是同一个实例
-        # 但实际可能因为每次hash值不同而不同，所以这里检查类型即可
+        # 缓存key由provider、api_key和base_url组成，应该是同一个实例
         assert isinstance(client1, OpenAIClient)
-        assert isinstance(client2, OpenAIClient)
+        assert client1 is client2
     
     def test_get_supported_providers(self):
         """测试获取支持的提供商列表"""
@@ -125,42 +138,14 @@ class TestLLMManager:
         return LLMManager()
     
     @pytest.fixture
-    def mock_config(self, manager):
+    def mock_config(self, manager, monkeypatch):
         """Mock配置管理器"""
-        with patch.object(manager.config_manager, 'get_api_key') as mock_get_key, \
-             patch.object(manager.config_manager, 'get_base_url') as mock_get_url, \
-             patch.object(manager.config_manager, 'get_configured_providers') as mock_providers, \
-             patch.object(manager.config_manager, 'get_default_provider') as mock_default:
-            
-            # 设置模拟返回值
-            def get_api_key_side_effect(provider):
-                keys = {
-                    LLMProvider.OPENAI: "test-openai-key",
-                    LLMProvider.CLAUDE: "test-claude-key",
-                    LLMProvider.QWEN: "test-qwen-key",
-                    LLMProvider.DEEPSEEK: "test-deepseek-key",
-                }
-                return keys.get(provider)
-            
-            def get_base_url_side_effect(provider):
-                urls = {
-                    LLMProvider.OPENAI: "https://api.moonshot.cn/v1",
-                    LLMProvider.QWEN: "https://dashscope.aliyuncs.com/api/v1",
-                    LLMProvider.DEEPSEEK: "https://api.deepseek.com/v1",
-                }
-                return urls.get(provider)
-            
-            mock_get_key.side_effect = get_api_key_side_effect
-            mock_get_url.side_effect = get_base_url_side_effect
-            mock_providers.return_value = [LLMProvider.OPENAI, LLMProvider.CLAUDE]
-            mock_default.return_value = LLMProvider.OPENAI
-            
-            yield {
-                'get_api_key': mock_get_key,
-                'get_base_url': mock_get_url,
-                'get_configured_providers': mock_providers,
-                'get_default_provider': mock_default
-            }
+        monkeypatch.setattr(manager.config_manager, 'get_api_key', TEST_API_KEYS.get)
+        monkeypatch.setattr(manager.config_manager, 'get_base_url', TEST_BASE_URLS.get)
+        monkeypatch.setattr(manager.config_manager, 'get_configured_providers',
+                            lambda: [LLMProvider.OPENAI, LLMProvider.CLAUDE])
+        monkeypatch.setattr(manager.config_manager, 'get_default_provider',
+                            lambda: LLMProvider.OPENAI)
     
     def test_initialization(self, manager, mock_config):
         """测试初始化"""
@@ -217,18 +202,8 @@ class TestLLMManager:
     async def test_generate_visualization_code_success(self, manager, mock_config):
         """测试生成可视化代码 - 成功情况"""
         # Mock客户端和响应
-        mock_response = LLMResponse(
-            success=True,
-            content="# Generated code",
-            usage_stats={"total_tokens": 100},
-            response_time=1.5,
-            system_prompt="System prompt",
-            user_prompt="User prompt",
-            full_prompt="Full prompt"
-        )
-        
         mock_client = AsyncMock()
-        mock_client.generate_completion.return_value = mock_response
+        mock_client.generate_completion.return_value = MOCK_RESPONSE
         
         # Mock模板管理器
         mock_template = MagicMock()
@@ -268,7 +243,7 @@ class TestLLMManager:
         """测试获取提供商信息"""
         # Mock客户端
         mock_client = MagicMock()
-        mock_client.get_supported_models.return_value = ["model1", "model2"]
+        mock_client.get_supported_models.return_value = ("model1", "model2")
         mock_client.get_default_model.return_value = "model1"
         
         with patch.object(LLMClientFactory, 'create_client', return_value=mock_client):
@@ -281,13 +256,13 @@ class TestLLMManager:
             assert info["configured"] is True
             assert info["base_url"] == "https://api.moonshot.cn/v1"
             assert info["default_model"] == "model1"
-            assert info["supported_models"] == ["model1", "model2"]
+            assert tuple(info["supported_models"]) == ("model1", "model2")
     
     def test_get_all_providers_info(self, manager, mock_config):
         """测试获取所有提供商信息"""
         # Mock客户端
         mock_client = MagicMock()
-        mock_client.get_supported_models.return_value = ["model1"]
+        mock_client.get_supported_models.return_value = ("model1",)
         mock_client.get_default_model.return_value = "model1"
         
         with patch.object(LLMClientFactory, 'create_client', return_value=mock_client):
@@ -301,259 +276,48 @@ class TestLLMManager:
             assert all("provider" in info for info in all_info)
 
 @pytest.mark.integration
+@pytest.mark.xdist_group(name="network")
 class TestClientIntegration:
     """客户端集成测试（需要真实API密钥）"""
     
     @pytest.mark.asyncio
-    @pytest.mark.skipif(
-        not os.getenv("OPENAI_API_KEY"), 
-        reason="需要OPENAI_API_KEY环境变量"
-    )
-    async def test_openai_real_request(self):
-        """测试OpenAI真实请求（跳过如果没有API密钥）"""
-        api_key = os.getenv("OPENAI_API_KEY")
-        base_url = os.getenv("OPENAI_BASE_URL")
-        
-        client = OpenAIClient(api_key=api_key, base_url=base_url)
-        
-        print(f"\n=== OpenAI 测试 ===")
-        print(f"API Key: {api_key[:10]}..." if api_key else "未配置")
-        print(f"Base URL: {base_url}")
-        
-        # 检查模型配置
-        default_model = client.get_default_model()
-        supported_models = client.get_supported_models()
-        print(f"默认模型: {default_model}")
-        print(f"支持的模型: {supported_models[:3]}...")  # 只显示前3个
-        
-        # 测试连接
-        print("正在测试连接...")
-        connection_ok = await client.test_connection()
-        print(f"连接结果: {connection_ok}")
-        assert connection_ok is True
-        
-        # 测试简单请求
-        print("正在发送测试请求...")
-        response = await client.generate_completion(
-            system_prompt="你是一个数学助手",
-            user_prompt="1+1等于几？请简单回答。",
-            config={"model": default_model, "temperature": 0.1, "max_tokens": 50}
-        )
-        
-        print(f"请求成功: {response.success}")
-        if response.success:
-            print(f"响应内容: {response.content}")
-            print(f"使用统计: {response.usage_stats}")
-            print(f"响应时间: {response.response_time:.2f}秒")
-            assert len(response.content) > 0
-            assert "usage_stats" in response.__dict__
-        else:
-            print(f"错误信息: {response.error_message}")
-            assert False, f"请求失败: {response.error_message}"
-    
-    @pytest.mark.asyncio
-    @pytest.mark.skipif(
-        not os.getenv("CLAUDE_API_KEY") or 
-        os.getenv("CLAUDE_BASE_URL", "").find("moonshot") != -1,
-        reason="需要真正的CLAUDE_API_KEY环境变量，跳过Moonshot兼容配置"
-    )
-    async def test_claude_real_request(self):
-        """测试Claude真实请求（跳过如果没有API密钥或使用Moonshot配置）"""
-        api_key = os.getenv("CLAUDE_API_KEY")
-        base_url = os.getenv("CLAUDE_BASE_URL")
-        
-        # 如果base_url包含moonshot，说明这不是真正的Claude API
-        if base_url and "moonshot" in base_url.lower():
-            pytest.skip("检测到Moonshot配置，跳过Claude真实API测试")
-        
-        client = ClaudeClient(api_key=api_key, base_url=base_url)
-        
-        print(f"\n=== Claude 真实API 测试 ===")
-        print(f"API Key: {api_key[:10]}..." if api_key else "未配置")
-        print(f"Base URL: {base_url}")
-        
-        # 检查模型配置
-        default_model = client.get_default_model()
-        supported_models = client.get_supported_models()
-        print(f"默认模型: {default_model}")
-        print(f"支持的模型: {supported_models[:3]}...")  # 只显示前3个
-        
-        # 测试连接
-        print("正在测试连接...")
-        connection_ok = await client.test_connection()
-        print(f"连接结果: {connection_ok}")
-        assert connection_ok is True
-        
-        # 测试简单请求
-        print("正在发送测试请求...")
-        response = await client.generate_completion(
-            system_prompt="你是一个数学助手",
-            user_prompt="1+1等于几？请简单回答。",
-            config={"model": default_model, "temperature": 0.1, "max_tokens": 50}
-        )
-        
-        print(f"请求成功: {response.success}")
-        if response.success:
-            print(f"响应内容: {response.content}")
-            print(f"使用统计: {response.usage_stats}")
-            print(f"响应时间: {response.response_time:.2f}秒")
-            assert len(response.content) > 0
-        else:
-            print(f"错误信息: {response.error_message}")
-            assert False, f"请求失败: {response.error_message}"
-    
-    @pytest.mark.asyncio
-    @pytest.mark.skipif(
-        not os.getenv("CLAUDE_API_KEY") or 
-        not os.getenv("CLAUDE_BASE_URL") or 
-        os.getenv("CLAUDE_BASE_URL", "").find("moonshot") == -1,
-        reason="需要配置Moonshot兼容的Claude配置进行测试"
-    )
-    async def test_moonshot_claude_compatible_request(self):
-        """测试Moonshot兼容Claude请求（当配置为Moonshot时）"""
-        api_key = os.getenv("CLAUDE_API_KEY")
-        base_url = os.getenv("CLAUDE_BASE_URL")
-        
-        # 确认这确实是Moonshot配置
-        if not (base_url and "moonshot" in base_url.lower()):
-            pytest.skip("不是Moonshot配置，跳过兼容测试")
-        
-        client = ClaudeClient(api_key=api_key, base_url=base_url)
-        
-        print(f"\n=== Moonshot Claude兼容 测试 ===")
-        print(f"API Key: {api_key[:10]}..." if api_key else "未配置")
-        print(f"Base URL: {base_url}")
-        
-        # 检查模型名称是否正确切换到Moonshot格式
-        default_model = client.get_default_model()
-        supported_models = client.get_supported_models()
-        
-        print(f"检测到Moonshot配置，默认模型: {default_model}")
-        print(f"支持的模型: {supported_models}")
-        
-        # 对于Moonshot配置，应该使用moonshot或kimi模型名称
-        assert "moonshot" in default_model or "kimi" in default_model
-        assert any("moonshot" in model or "kimi" in model for model in supported_models)
-        
-        # 测试连接 - 现在应该能够成功
-        print("正在测试连接...")
-        connection_ok = await client.test_connection()
-        print(f"连接结果: {connection_ok}")
-        
-        # 如果连接成功，测试一个简单的请求
-        if connection_ok:
-            print("正在发送测试请求...")
-            response = await client.generate_completion(
-                system_prompt="你是一个数学助手",
-                user_prompt="1+1等于几？请简单回答。",
-                config={"model": default_model, "temperature": 0.1, "max_tokens": 50}
-            )
+    async def test_all_providers_smoke(self, cached_generate_completion):
+        """对所有已配置API密钥的提供商并发执行冒烟测试"""
+        clients = []
+        for name, client_class, env_prefix in INTEGRATION_PROVIDERS:
+            api_key = os.getenv(f"{env_prefix}_API_KEY")
+            if api_key:
+                base_url = os.getenv(f"{env_prefix}_BASE_URL")
+                clients.append((name, client_class(api_key=api_key, base_url=base_url)))
+        
+        if not clients:
+            pytest.skip("未配置任何LLM API密钥")
+        
+        for name, client in clients:
+            log.debug("%s 测试: base_url=%s default=%s supported=%s", name, client.base_url,
+                      client.get_default_model(), client.get_supported_models()[:3])
             
-            print(f"请求成功: {response.success}")
-            if response.success:
-                print(f"响应内容: {response.content}")
-                print(f"使用统计: {response.usage_stats}")
-                print(f"响应时间: {response.response_time:.2f}秒")
-                assert len(response.content) > 0
-            else:
-                print(f"错误信息: {response.error_message}")
-        
-        # 至少连接测试应该通过
-        assert connection_ok is True
-    
-    @pytest.mark.asyncio
-    @pytest.mark.skipif(
-        not os.getenv("QWEN_API_KEY"), 
-        reason="需要QWEN_API_KEY环境变量"
-    )
-    async def test_qwen_real_request(self):
-        """测试Qwen真实请求（跳过如果没有API密钥）"""
-        api_key = os.getenv("QWEN_API_KEY")
-        base_url = os.getenv("QWEN_BASE_URL")
-        
-        client = QwenClient(api_key=api_key, base_url=base_url)
-        
-        print(f"\n=== Qwen 测试 ===")
-        print(f"API Key: {api_key[:10]}..." if api_key else "未配置")
-        print(f"Base URL: {base_url}")
-        
-        # 检查模型配置
-        default_model = client.get_default_model()
-        supported_models = client.get_supported_models()
-        print(f"默认模型: {default_model}")
-        print(f"支持的模型: {supported_models}")
-        
-        # 测试连接
-        print("正在测试连接...")
-        connection_ok = await client.test_connection()
-        print(f"连接结果: {connection_ok}")
-        
-        if connection_ok:
-            # 测试简单请求
-            print("正在发送测试请求...")
-            response = await client.generate_completion(
+            # Moonshot兼容的Claude配置应该使用moonshot或kimi模型名称
+            if isinstance(client, ClaudeClient) and client.base_url and "moonshot" in client.base_url.lower():
+                default_model = client.get_default_model()
+                assert "moonshot" in default_model or "kimi" in default_model
+        
+        # 并发发送相同的测试请求；请求成功（无论实时还是缓存回放）即视为连接正常，
+        # 不再单独调用test_connection，避免缓存命中时仍产生网络请求
+        responses = await asyncio.gather(*(
+            cached_generate_completion(
+                client,
                 system_prompt="你是一个数学助手",
                 user_prompt="1+1等于几？请简单回答。",
-                config={"model": default_model, "temperature": 0.1, "max_tokens": 50}
+                config={"model": client.get_default_model(), "temperature": 0.1, "max_tokens": 50}
             )
-            
-            print(f"请求成功: {response.success}")
-            if response.success:
-                print(f"响应内容: {response.content}")
-                print(f"使用统计: {response.usage_stats}")
-                print(f"响应时间: {response.response_time:.2f}秒")
-                assert len(response.content) > 0
-            else:
-                print(f"错误信息: {response.error_message}")
-        else:
-            print("连接失败，跳过后续测试")
-    
-    @pytest.mark.asyncio
-    @pytest.mark.skipif(
-        not os.getenv("DEEPSEEK_API_KEY"), 
-        reason="需要DEEPSEEK_API_KEY环境变量"
-    )
-    async def test_deepseek_real_request(self):
-        """测试DeepSeek真实请求（跳过如果没有API密钥）"""
-        api_key = os.getenv("DEEPSEEK_API_KEY")
-        base_url = os.getenv("DEEPSEEK_BASE_URL")
-        
-        client = DeepSeekClient(api_key=api_key, base_url=base_url)
-        
-        print(f"\n=== DeepSeek 测试 ===")
-        print(f"API Key: {api_key[:10]}..." if api_key else "未配置")
-        print(f"Base URL: {base_url}")
-        
-        # 检查模型配置
-        default_model = client.get_default_model()
-        supported_models = client.get_supported_models()
-        print(f"默认模型: {default_model}")
-        print(f"支持的模型: {supported_models}")
+            for _, client in clients
+        ))
         
-        # 测试连接
-        print("正在测试连接...")
-        connection_ok = await client.test_connection()
-        print(f"连接结果: {connection_ok}")
-        
-        if connection_ok:
-            # 测试简单请求
-            print("正在发送测试请求...")
-            response = await client.generate_completion(
-                system_prompt="你是一个数学助手",
-                user_prompt="1+1等于几？请简单回答。",
-                config={"model": default_model, "temperature": 0.1, "max_tokens": 50}
-            )
-            
-            print(f"请求成功: {response.success}")
-            if response.success:
-                print(f"响应内容: {response.content}")
-                print(f"使用统计: {response.usage_stats}")
-                print(f"响应时间: {response.response_time:.2f}秒")
-                assert len(response.content) > 0
-            else:
-                print(f"错误信息: {response.error_message}")
-        else:
-            print("连接失败，跳过后续测试")
+        for (name, _), response in zip(clients, responses):
+            _log_response(name, response)
+            assert response.success, f"{name} 请求失败: {response.error_message}"
+            assert len(response.content) > 0
 
 if __name__ == "__main__":
     # 运行测试
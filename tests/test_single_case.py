@@ -9,6 +9,23 @@ import json
 import time
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def parse_json(response) -> dict:
+    """解析响应JSON（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+def format_json(data) -> str:
+    """格式化输出JSON（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
 def test_single_case():
     """测试单个案例"""
     base_url = "http://localhost:8004/api/v2"
@@ -34,10 +51,10 @@ def test_single_case():
         print(f"   状态码: {response.status_code}")
         
         if response.status_code == 200:
-            result = response.json()
+            result = parse_json(response)
             task_id = result.get("task_id")
             print(f"   ✅ 任务创建成功: {task_id}")
-            print(f"   📊 响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
+            print(f"   📊 响应: {format_json(result)}")
         else:
             print(f"   ❌ 任务创建失败: {response.text}")
             return
@@ -56,7 +73,7 @@ def test_single_case():
         try:
             response = requests.get(f"{base_url}/tasks/{task_id}", timeout=5)
             if response.status_code == 200:
-                status_data = response.json()
+                status_data = parse_json(response)
                 current_status = status_data.get("status")
                 progress = status_data.get("progress", 0)
                 
@@ -87,7 +104,7 @@ def test_single_case():
                         print("✅ 测试成功！")
                     else:
                         print("❌ 测试失败！")
-                        print(f"📄 完整响应: {json.dumps(status_data, ensure_ascii=False, indent=2)}")
+                        print(f"📄 完整响应: {format_json(status_data)}")
                     
                     return status_data
             else:
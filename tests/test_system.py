@@ -6,122 +6,39 @@ AI数学可视化系统综合测试套件
 """
 
 import asyncio
-import sys
+import functools
 import os
-import shutil
+import re
+import socket
+import subprocess
+import sys
 from pathlib import Path
 
-# 添加项目路径
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import matplotlib
+import pytest
+import pytest_asyncio
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-class SystemTester:
-    def __init__(self):
-        self.test_output_dir = "tests/output"
-        self.ensure_test_dirs()
-    
-    def ensure_test_dirs(self):
-        """确保测试目录存在"""
-        os.makedirs(self.test_output_dir, exist_ok=True)
-    
-    def cleanup_test_files(self):
-        """清理测试生成的文件"""
-        if os.path.exists(self.test_output_dir):
-            shutil.rmtree(self.test_output_dir)
-        self.ensure_test_dirs()
-
-    def test_basic_imports(self):
-        """测试基础模块导入"""
-        print("🧪 测试基础模块导入...")
-        
-        try:
-            # 测试核心依赖
-            import matplotlib
-            matplotlib.use('Agg')
-            import matplotlib.pyplot as plt
-            import numpy as np
-            print("✅ 核心依赖库导入成功")
-            
-            # 测试项目模块
-            from backend.models.schema import ProblemRequest, LLMProvider
-            from backend.ai_service.prompt_templates import render_prompt
-            from backend.execution.validator import validate_code_security
-            print("✅ 项目模块导入成功")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ 模块导入失败: {e}")
-            return False
-
-    def test_pydantic_models(self):
-        """测试Pydantic数据模型"""
-        print("🧪 测试Pydantic数据模型...")
-        
-        try:
-            from backend.models.schema import (
-                ProblemRequest, AIAnalysisResult, ExecutionResult, 
-                TaskInfo, LLMProvider, PromptTemplate
-            )
-            
-            # 测试ProblemRequest
-            request = ProblemRequest(
-                text="甲、乙两地相距480公里的测试问题",
-                user_id="test_user",
-                llm_provider=LLMProvider.OPENAI
-            )
-            print(f"✅ ProblemRequest创建成功: {request.text}")
-            
-            # 测试PromptTemplate
-            template = PromptTemplate(
-                name="test_template",
-                system_prompt="测试系统提示",
-                user_prompt_template="测试用户提示: {problem_text}",
-                llm_config={"model": "test-model"}
-            )
-            print(f"✅ PromptTemplate创建成功: {template.name}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ Pydantic模型测试失败: {e}")
-            return False
-
-    def test_prompt_system(self):
-        """测试Prompt模板系统"""
-        print("🧪 测试Prompt模板系统...")
-        
-        try:
-            from backend.ai_service.prompt_templates import render_prompt, get_prompt_manager
-            
-            # 测试模板渲染
-            system_prompt, user_prompt = render_prompt(
-                problem_text="甲、乙两地相距480公里，两车相向而行，速度分别为60和80公里/小时，求相遇时间。",
-                output_path=f"{self.test_output_dir}/test.png"
-            )
-            
-            # 验证prompt内容
-            if "数学题目可视化专家" in system_prompt and "480公里" in user_prompt:
-                print("✅ Prompt模板渲染成功")
-                print(f"   系统Prompt: {len(system_prompt)}字符")
-                print(f"   用户Prompt: {len(user_prompt)}字符")
-                return True
-            else:
-                print("❌ Prompt内容验证失败")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Prompt系统测试失败: {e}")
-            return False
-
-    def test_code_validation(self):
-        """测试代码安全验证"""
-        print("🧪 测试代码安全验证...")
-        
-        try:
-            from backend.execution.validator import validate_code_security
-            
-            # 测试安全代码
-            safe_code = """
+from pydantic import ValidationError
+
+from backend.models.schema import ProblemRequest, LLMProvider, PromptTemplate, ProcessingMode
+from backend.ai_service.prompt_templates import render_prompt
+from backend.ai_service.llm_client import (
+    OpenAIClient, ClaudeClient, QwenClient, get_llm_manager
+)
+from backend.execution.validator import validate_code_security
+from backend.config import get_config_manager
+from backend.api.endpoints import router
+
+# PNG文件头
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# 安全验证测试代码
+SAFE_CODE = """
 import matplotlib.pyplot as plt
 import numpy as np
 
@@ -139,322 +56,281 @@ plt.close()
 
 result = {'success': True, 'function': 'sin(x)'}
 """
-            
-            result = validate_code_security(safe_code)
-            if result.is_valid:
-                print("✅ 安全代码验证通过")
-            else:
-                print(f"❌ 安全代码验证失败: {result.security_issues}")
-                return False
-            
-            # 测试危险代码
-            dangerous_code = "import os; os.system('rm -rf /')"
-            result2 = validate_code_security(dangerous_code)
-            
-            if not result2.is_valid:
-                print("✅ 危险代码被正确拦截")
-                return True
-            else:
-                print("❌ 危险代码未被拦截")
-                return False
-                
-        except Exception as e:
-            print(f"❌ 代码验证测试失败: {e}")
-            return False
-
-    def test_code_execution(self):
-        """测试代码执行功能"""
-        print("🧪 测试代码执行功能...")
-        
-        try:
-            import matplotlib
-            matplotlib.use('Agg')
-            import matplotlib.pyplot as plt
-            import numpy as np
-            
-            # 测试代码
-            test_code = f"""
-import matplotlib
-matplotlib.use('Agg')
+DANGEROUS_CODE = "import os; os.system('rm -rf /')"
+
+# 必须注册的API路由
+EXPECTED_ROUTES = ("/problems/generate", "/tasks/{task_id}", "/health")
+EXPECTED_ROUTE_PATTERN = re.compile("|".join(map(re.escape, EXPECTED_ROUTES)))
+
+# 本地v2服务地址
+API_HOST = "127.0.0.1"
+API_PORT = 8002
+
+
+@functools.lru_cache(maxsize=32)
+def _render(problem_text: str, output_path: str) -> tuple[str, str]:
+    """渲染prompt（相同输入复用结果）"""
+    return render_prompt(problem_text=problem_text, output_path=output_path)
+
+
+@functools.lru_cache(maxsize=32)
+def _validate(code: str):
+    """代码安全验证（相同输入复用结果）"""
+    return validate_code_security(code)
+
+
+def _parse_json(response) -> dict:
+    """解析响应JSON（优先使用orjson直接解析字节）"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+@pytest.fixture(scope="session")
+def output_dir(tmp_path_factory):
+    """测试输出目录"""
+    return tmp_path_factory.mktemp("output")
+
+
+@pytest.fixture(scope="session")
+def execution_image(output_dir) -> Path:
+    """代码执行测试生成的图片路径"""
+    return output_dir / "execution_test.png"
+
+
+@pytest.fixture
+def produced_files():
+    """记录测试生成的文件，结束后逐个删除"""
+    produced: set[Path] = set()
+    yield produced
+    for path in produced:
+        path.unlink(missing_ok=True)
+
+
+@pytest.fixture(scope="session")
+def api_server_up() -> bool:
+    """探测本地v2服务是否在运行"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.05)
+        return sock.connect_ex((API_HOST, API_PORT)) == 0
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def api_client():
+    """在整个测试会话中共享的v2 API HTTP客户端"""
+    httpx = pytest.importorskip("httpx")
+    async with httpx.AsyncClient(
+        base_url=f"http://{API_HOST}:{API_PORT}/api/v2",
+        timeout=httpx.Timeout(1.0, connect=0.2),
+        transport=httpx.AsyncHTTPTransport(
+            retries=0,
+            limits=httpx.Limits(max_keepalive_connections=16)
+        )
+    ) as client:
+        yield client
+
+
+def test_basic_imports():
+    """测试基础模块导入"""
+    # 项目模块在文件顶部导入，导入失败时收集阶段即报错；这里只检查绘图后端
+    assert matplotlib.get_backend().lower() == "agg"
+
+
+@pytest.fixture(scope="session")
+def problem_request():
+    """测试用ProblemRequest（提供商以字符串传入，检验枚举转换）"""
+    return ProblemRequest(
+        text="甲、乙两地相距480公里的测试问题",
+        user_id="test_user",
+        llm_provider="openai"
+    )
+
+
+@pytest.fixture(scope="session")
+def prompt_template():
+    """测试用PromptTemplate"""
+    return PromptTemplate(
+        system_prompt="测试系统提示",
+        user_prompt_template="测试用户提示: {problem_text}",
+        llm_config={"model": "test-model"}
+    )
+
+
+def test_problem_request_model(problem_request):
+    """测试ProblemRequest的类型转换、默认值与长度校验"""
+    assert problem_request.llm_provider is LLMProvider.OPENAI
+    assert problem_request.processing_mode is ProcessingMode.AI
+    assert problem_request.prompt_variant == "default"
+    
+    with pytest.raises(ValidationError):
+        ProblemRequest(text="太短")
+    with pytest.raises(ValidationError):
+        ProblemRequest(text="甲、乙两地相距480公里的测试问题", llm_provider="unknown")
+
+
+def test_prompt_template_model(prompt_template):
+    """测试PromptTemplate的必填字段与默认配置"""
+    assert prompt_template.llm_config == {"model": "test-model"}
+    assert PromptTemplate(system_prompt="s", user_prompt_template="u").llm_config == {}
+    
+    with pytest.raises(ValidationError):
+        PromptTemplate(user_prompt_template="u")
+
+
+def test_prompt_system(output_dir):
+    """测试Prompt模板系统"""
+    # 测试模板渲染
+    system_prompt, user_prompt = _render(
+        "甲、乙两地相距480公里，两车相向而行，速度分别为60和80公里/小时，求相遇时间。",
+        str(output_dir / "test.png")
+    )
+
+    # 验证prompt内容
+    assert "visualization_code" in system_prompt
+    assert "480公里" in user_prompt
+
+
+@pytest.mark.parametrize("code,expected", [
+    (SAFE_CODE, True),
+    (DANGEROUS_CODE, False),
+], ids=["safe", "dangerous"])
+def test_code_validation(code, expected):
+    """测试代码安全验证"""
+    result = _validate(code)
+    assert result.is_valid == expected, f"验证结果不符合预期: {result.security_issues}"
+
+
+# 绘图测试代码（输出路径通过命令行参数传入，避免每次调用重新格式化源码）
+PLOT_TEST_CODE = """
+import sys
+
 import matplotlib.pyplot as plt
 import numpy as np
 
+OUTPUT_PATH = sys.argv[1]
+
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
 
 x = np.linspace(0, 10, 50)
 y = np.sin(x)
 
-plt.figure(figsize=(8, 6))
-plt.plot(x, y, 'b-', linewidth=2, label='sin(x)')
-plt.xlabel('X')
-plt.ylabel('Y')
-plt.title('测试图表')
-plt.legend()
-plt.grid(True, alpha=0.3)
-
-plt.savefig('{self.test_output_dir}/execution_test.png', dpi=300, bbox_inches='tight')
-plt.close()
+fig, ax = plt.subplots(figsize=(8, 6))
+ax.plot(x, y, 'b-', linewidth=2, label='sin(x)')
+ax.set_xlabel('X')
+ax.set_ylabel('Y')
+ax.set_title('测试图表')
+ax.legend()
+ax.grid(True, alpha=0.3)
 
-result = {{'success': True, 'function': 'sin(x)'}}
+fig.savefig(OUTPUT_PATH, dpi=72)
+plt.close(fig)
 """
-            
-            # 执行代码
-            globals_dict = {}
-            exec(test_code, globals_dict)
-            
-            # 检查结果
-            if os.path.exists(f'{self.test_output_dir}/execution_test.png'):
-                print("✅ 代码执行成功，图片已生成")
-                return True
-            else:
-                print("❌ 代码执行失败，图片未生成")
-                return False
-                
-        except Exception as e:
-            print(f"❌ 代码执行测试失败: {e}")
-            return False
-
-    async def test_llm_clients(self):
-        """测试LLM客户端（模拟）"""
-        print("🧪 测试LLM客户端...")
-        
-        try:
-            from backend.ai_service.llm_client import (
-                OpenAIClient, ClaudeClient, QwenClient
-            )
-            
-            # 测试客户端创建（使用模拟的API密钥）
-            openai_client = OpenAIClient("test-key")
-            claude_client = ClaudeClient("test-key")
-            qwen_client = QwenClient("test-key")
-            
-            print("✅ LLM客户端创建成功")
-            print(f"   OpenAI客户端: {type(openai_client).__name__}")
-            print(f"   Claude客户端: {type(claude_client).__name__}")
-            print(f"   Qwen客户端: {type(qwen_client).__name__}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ LLM客户端测试失败: {e}")
-            return False
-
-    def test_api_endpoints(self):
-        """测试API端点（模拟）"""
-        print("🧪 测试API端点...")
-        
-        try:
-            from backend.api.endpoints import router
-            print("✅ FastAPI路由器创建成功")
-            
-            # 检查路由
-            routes = [route.path for route in router.routes]
-            expected_routes = ["/problems/generate", "/tasks/{task_id}", "/health"]
-            
-            for route in expected_routes:
-                if any(route in r for r in routes):
-                    print(f"✅ 路由存在: {route}")
-                else:
-                    print(f"❌ 路由缺失: {route}")
-                    return False
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ API端点测试失败: {e}")
-            return False
-
-    async def test_v2_api_http(self):
-        """测试v2 API HTTP接口"""
-        print("🧪 测试v2 API HTTP接口...")
-        
-        try:
-            import httpx
-            
-            # 测试健康检查端点
-            async with httpx.AsyncClient() as client:
-                response = await client.get("http://localhost:8002/api/v2/health")
-                if response.status_code == 200:
-                    health_data = response.json()
-                    print(f"✅ 健康检查通过: {health_data['status']}")
-                else:
-                    print(f"❌ 健康检查失败: {response.status_code}")
-                    return False
-                
-                # 测试配置端点
-                response = await client.get("http://localhost:8002/api/v2/config")
-                if response.status_code == 200:
-                    config_data = response.json()
-                    print(f"✅ 配置查询成功: 默认提供商 {config_data['default_provider']}")
-                else:
-                    print(f"❌ 配置查询失败: {response.status_code}")
-                    return False
-                
-                # 测试任务列表端点
-                response = await client.get("http://localhost:8002/api/v2/tasks")
-                if response.status_code == 200:
-                    tasks = response.json()
-                    print(f"✅ 任务列表查询成功: {len(tasks)} 个任务")
-                else:
-                    print(f"❌ 任务列表查询失败: {response.status_code}")
-                    return False
-                
-                # 测试问题生成端点（应该失败，因为没有API密钥）
-                test_request = {
-                    "text": "甲、乙两地相距100公里，小明以50公里/小时的速度从甲地出发，求2小时后的位置。",
-                    "user_id": "test_user",
-                    "llm_provider": "openai"
-                }
-                response = await client.post(
-                    "http://localhost:8002/api/v2/problems/generate",
-                    json=test_request
-                )
-                if response.status_code == 400:
-                    print("✅ 问题生成端点正确返回错误（缺少API密钥）")
-                else:
-                    print(f"✅ 问题生成端点响应: {response.status_code}")
-                
-            return True
-            
-        except ImportError:
-            print("⚠️ httpx 未安装，跳过HTTP测试")
-            return True
-        except Exception as e:
-            print(f"❌ v2 API HTTP测试失败: {e}")
-            return False
-
-    async def test_api_key_configuration(self):
-        """测试API密钥配置功能"""
-        print("🧪 测试API密钥配置功能...")
-        
-        try:
-            from backend.config import get_config_manager
-            from backend.ai_service.llm_client import get_llm_manager
-            from backend.models.schema import LLMProvider
-            
-            config_manager = get_config_manager()
-            llm_manager = get_llm_manager()
-            
-            # 测试配置管理器
-            summary = config_manager.get_config_summary()
-            print(f"✅ 配置管理器工作正常")
-            print(f"   已配置提供商: {', '.join(summary['configured_providers'])}")
-            print(f"   默认提供商: {summary['default_provider']}")
-            
-            # 测试API密钥检查
-            openai_configured = config_manager.is_provider_configured(LLMProvider.OPENAI)
-            claude_configured = config_manager.is_provider_configured(LLMProvider.CLAUDE)
-            
-            print(f"✅ API密钥状态检查:")
-            print(f"   OpenAI: {'已配置' if openai_configured else '未配置'}")
-            print(f"   Claude: {'已配置' if claude_configured else '未配置'}")
-            
-            # 测试LLM管理器的配置检查
-            available_providers = llm_manager.get_available_providers()
-            print(f"✅ LLM管理器可用提供商: {[p.value for p in available_providers]}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ API密钥配置测试失败: {e}")
-            return False
-
-    async def run_all_tests(self):
-        """运行所有测试"""
-        print("🚀 开始运行系统综合测试\n")
-        print("="*60)
-        
-        tests = [
-            ("基础模块导入", self.test_basic_imports),
-            ("Pydantic数据模型", self.test_pydantic_models),
-            ("Prompt模板系统", self.test_prompt_system),
-            ("代码安全验证", self.test_code_validation),
-            ("代码执行功能", self.test_code_execution),
-            ("LLM客户端", self.test_llm_clients),
-            ("API端点", self.test_api_endpoints),
-            ("v2 API HTTP接口", self.test_v2_api_http),
-            ("API密钥配置", self.test_api_key_configuration)
-        ]
-        
-        results = []
-        for test_name, test_func in tests:
-            print(f"\n📋 {test_name}:")
-            print("-" * 40)
-            
-            if asyncio.iscoroutinefunction(test_func):
-                result = await test_func()
-            else:
-                result = test_func()
-                
-            results.append((test_name, result))
-        
-        # 汇总结果
-        print("\n" + "="*60)
-        print("测试结果汇总:")
-        print("="*60)
-        
-        passed = 0
-        for test_name, result in results:
-            status = "✅ 通过" if result else "❌ 失败"
-            print(f"{test_name:20} {status}")
-            if result:
-                passed += 1
-        
-        total = len(results)
-        success_rate = passed / total
-        
-        print("-" * 60)
-        print(f"总计: {passed}/{total} 通过")
-        print(f"成功率: {success_rate:.1%}")
-        
-        if success_rate == 1.0:
-            print("\n🎉 所有测试通过！系统状态良好")
-        elif success_rate >= 0.8:
-            print("\n✅ 大部分测试通过，系统基本可用")
-        elif success_rate >= 0.6:
-            print("\n⚠️ 部分测试失败，需要检查")
-        else:
-            print("\n❌ 多个测试失败，系统需要修复")
-        
-        return success_rate
-
-    def cleanup_and_summary(self):
-        """清理并总结"""
-        print(f"\n🧹 清理测试文件...")
-        
-        # 可选择性保留一些有用的测试输出
-        test_files = []
-        if os.path.exists(f'{self.test_output_dir}/execution_test.png'):
-            test_files.append('execution_test.png')
-        
-        if test_files:
-            print(f"✅ 保留测试文件: {', '.join(test_files)}")
-        
-        print("✅ 测试完成")
-
-
-def main():
-    """主函数"""
-    tester = SystemTester()
-    
-    try:
-        # 运行异步测试
-        result = asyncio.run(tester.run_all_tests())
-        
-        # 清理和总结
-        tester.cleanup_and_summary()
-        
-        return result
-        
-    except KeyboardInterrupt:
-        print("\n⚠️ 测试被用户中断")
-        return 0.0
-    except Exception as e:
-        print(f"\n❌ 测试执行失败: {e}")
-        return 0.0
-
-
-if __name__ == "__main__":
-    success_rate = main()
-    exit_code = 0 if success_rate >= 0.8 else 1
-    sys.exit(exit_code)
+
+# 子进程通过环境变量直接使用Agg后端，无需在代码中切换
+PLOT_ENV = {**os.environ, "MPLBACKEND": "Agg"}
+
+
+def _run_plot_snippet(src: str, out: Path) -> bool:
+    """在独立的Python进程中执行绘图代码，返回图片是否生成"""
+    subprocess.run([sys.executable, "-c", src, str(out)], check=True, timeout=30, env=PLOT_ENV)
+    return out.is_file()
+
+
+def test_code_execution(execution_image, produced_files):
+    """测试代码执行功能"""
+    produced_files.add(execution_image)
+
+    # 在子进程中执行代码，避免matplotlib全局状态影响测试进程
+    assert _run_plot_snippet(PLOT_TEST_CODE, execution_image), "代码执行失败，图片未生成"
+    assert execution_image.read_bytes().startswith(PNG_SIGNATURE), "生成的文件不是PNG图片"
+
+
+@pytest.mark.asyncio
+async def test_llm_clients():
+    """测试LLM客户端（模拟）"""
+    # 测试客户端创建（使用模拟的API密钥）
+    openai_client = OpenAIClient("test-key")
+    claude_client = ClaudeClient("test-key")
+    qwen_client = QwenClient("test-key")
+
+    assert openai_client.api_key == "test-key"
+    assert claude_client.api_key == "test-key"
+    assert qwen_client.api_key == "test-key"
+
+
+def test_api_endpoints():
+    """测试API端点（模拟）"""
+    # 检查路由（对拼接后的路由做一次正则扫描，保留原有的包含匹配语义）
+    routes = "|".join({route.path for route in router.routes})
+    matched = set(EXPECTED_ROUTE_PATTERN.findall(routes))
+
+    # 汇总所有路由的检查结果后一次性输出
+    messages = [
+        f"✅ 路由存在: {route}" if route in matched else f"❌ 路由缺失: {route}"
+        for route in EXPECTED_ROUTES
+    ]
+    print("\n".join(messages))
+
+    missing = [route for route in EXPECTED_ROUTES if route not in matched]
+    assert not missing, f"路由缺失: {missing}"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_v2_api_http(api_server_up, api_client):
+    """测试v2 API HTTP接口"""
+    if not api_server_up:
+        pytest.skip("本地v2服务未运行")
+
+    # 测试问题生成端点（没有API密钥时返回400）
+    test_request = {
+        "text": "甲、乙两地相距100公里，小明以50公里/小时的速度从甲地出发，求2小时后的位置。",
+        "user_id": "test_user",
+        "llm_provider": "openai"
+    }
+
+    # 各端点互不依赖，并发发送请求
+    health, config, tasks, generate = await asyncio.gather(
+        api_client.get("/health"),
+        api_client.get("/config"),
+        api_client.get("/tasks"),
+        api_client.post("/problems/generate", json=test_request),
+        return_exceptions=True
+    )
+
+    for r in (health, config, tasks, generate):
+        if isinstance(r, BaseException):
+            raise r
+
+    # 健康检查端点
+    assert health.status_code == 200, f"健康检查失败: {health.status_code}"
+    assert "status" in _parse_json(health)
+
+    # 配置端点
+    assert config.status_code == 200, f"配置查询失败: {config.status_code}"
+    assert "default_provider" in _parse_json(config)
+
+    # 任务列表端点
+    assert tasks.status_code == 200, f"任务列表查询失败: {tasks.status_code}"
+
+    # 问题生成端点
+    assert generate.status_code < 500, f"问题生成端点响应异常: {generate.status_code}"
+
+
+@pytest.mark.asyncio
+async def test_api_key_configuration():
+    """测试API密钥配置功能"""
+    config_manager = get_config_manager()
+    llm_manager = get_llm_manager()
+
+    # 测试配置管理器
+    summary = config_manager.get_config_summary()
+    assert "configured_providers" in summary
+    assert "default_provider" in summary
+
+    # 测试API密钥检查
+    assert isinstance(config_manager.is_provider_configured(LLMProvider.OPENAI), bool)
+    assert isinstance(config_manager.is_provider_configured(LLMProvider.CLAUDE), bool)
+
+    # 测试LLM管理器的配置检查
+    available_providers = llm_manager.get_available_providers()
+    assert LLMProvider.OPENAI in available_providers
@@ -7,40 +7,151 @@ V2 API 完整E2E测试脚本
 
 import sys
 import os
+import argparse
 import asyncio
+import contextlib
+import random
 import time
 import json
-from typing import Dict, Any, Optional
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
 import aiohttp
 from datetime import datetime
 
-# 添加项目路径
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# 轮询退避参数（秒）
+POLL_BASE_DELAY = 1.0
+POLL_MAX_DELAY = 8.0
+
+# 状态未变化时的轮询输出每累计多少行写出一次
+POLL_OUTPUT_BATCH = 10
+
+# 任务的终止状态
+TERMINAL_STATUSES = ("completed", "failed")
+
+# 并发运行的测试用例上限
+MAX_CONCURRENT_TESTS = 4
+
+# 当前协程所属的测试用例名称，用于并发输出时标记日志
+_current_test = ContextVar("current_test", default=None)
+
+# 日志时间戳的秒级前缀缓存：[所在秒, "%H:%M:%S"格式的前缀]
+_timestamp_cache = [0, ""]
+
+def _timestamp() -> str:
+    """返回HH:MM:SS.mmm格式的时间戳，同一秒内复用格式化好的前缀"""
+    now = time.time()
+    sec = int(now)
+    if sec != _timestamp_cache[0]:
+        _timestamp_cache[0] = sec
+        _timestamp_cache[1] = time.strftime("%H:%M:%S", time.localtime(now))
+    return f"{_timestamp_cache[1]}.{int((now - sec) * 1000):03d}"
+
+class _HttpxResponse:
+    """将httpx响应适配为与aiohttp响应一致的接口"""
+    
+    def __init__(self, response):
+        self.status = response.status_code
+        self.headers = response.headers
+        self._response = response
+    
+    async def read(self) -> bytes:
+        return self._response.content
+    
+    async def json(self) -> Any:
+        return self._response.json()
 
 class V2ApiE2ETester:
     """V2 API E2E测试器"""
     
-    def __init__(self, base_url: str = "http://localhost:8002/api/v2"):
+    def __init__(self, base_url: str = "http://localhost:8002/api/v2", debug: bool = False,
+                 transport: str = "aiohttp"):
         """
         初始化测试器
         
         Args:
             base_url: API基础URL
+            debug: 是否输出DEBUG级别的请求/响应日志
+            transport: HTTP客户端实现 (aiohttp, httpx)
         """
+        if transport == "httpx" and httpx is None:
+            raise ImportError("使用httpx传输需要安装httpx")
+        
         self.base_url = base_url
+        self.debug = debug
+        self.transport = transport
         self.session = None
         self.test_results = []
         self.start_time = None
+        # 配置端点缓存：(获取时间, 配置数据)
+        self._config_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._config_ttl = 30.0
     
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        self.session = aiohttp.ClientSession()
+        if self.transport == "httpx":
+            self.session = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=32),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                headers={"Content-Type": "application/json"}
+            )
+            return self
+        
+        # 复用连接池，避免轮询时每次请求都重新建立连接
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=32,
+            keepalive_timeout=75,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True
+        )
+        timeout = aiohttp.ClientTimeout(total=60, connect=10)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={"Content-Type": "application/json"}
+        )
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
-        if self.session:
+        if self.session is None:
+            return
+        
+        if self.transport == "httpx":
+            await self.session.aclose()
+        else:
             await self.session.close()
+            # 等待连接器完成底层连接的关闭
+            await asyncio.sleep(0.1)
+    
+    @contextlib.asynccontextmanager
+    async def _request(self, method: str, path: str, **kwargs):
+        """
+        发送HTTP请求，屏蔽aiohttp与httpx的接口差异
+        
+        Args:
+            method: HTTP方法
+            path: 相对于base_url的路径
+            
+        Yields:
+            响应对象（提供status、headers、read()和json()）
+        """
+        url = f"{self.base_url}{path}"
+        if self.transport == "httpx":
+            yield _HttpxResponse(await self.session.request(method, url, **kwargs))
+        else:
+            async with self.session.request(method, url, **kwargs) as response:
+                yield response
     
     def log(self, level: str, message: str, data: Optional[Dict] = None):
         """
@@ -51,7 +162,7 @@ class V2ApiE2ETester:
             message: 日志消息
             data: 额外数据
         """
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        timestamp = _timestamp()
         prefix_map = {
             "INFO": "ℹ️",
             "WARN": "⚠️",
@@ -61,18 +172,38 @@ class V2ApiE2ETester:
         }
         prefix = prefix_map.get(level, "📝")
         
+        test_name = _current_test.get()
+        if test_name:
+            message = f"[{test_name}] {message}"
+        
         print(f"[{timestamp}] {prefix} {message}")
-        if data:
-            print(f"    📊 数据: {json.dumps(data, ensure_ascii=False, indent=2)}")
+        if not data:
+            return
+        
+        # 只有DEBUG日志使用缩进格式，其余输出紧凑的单行JSON
+        if level == "DEBUG":
+            data_text = json.dumps(data, ensure_ascii=False, indent=2)
+        elif orjson is not None:
+            data_text = orjson.dumps(data, default=str).decode()
+        else:
+            data_text = json.dumps(data, ensure_ascii=False, default=str)
+        print(f"    📊 数据: {data_text}")
     
     async def test_config_endpoint(self) -> bool:
         """测试配置端点"""
         self.log("INFO", "🔧 测试配置端点...")
         
+        # 缓存未过期时直接复用
+        if self._config_cache and time.monotonic() - self._config_cache[0] < self._config_ttl:
+            self.log("SUCCESS", "配置端点响应正常（缓存）")
+            return True
+        
         try:
-            async with self.session.get(f"{self.base_url}/config") as response:
+            async with self._request("GET", "/config") as response:
                 if response.status == 200:
                     config_data = await response.json()
+                    # 在数据读取完成后记录时间，使缓存时长反映数据本身的时效
+                    self._config_cache = (time.monotonic(), config_data)
                     self.log("SUCCESS", "配置端点响应正常", {
                         "configured_providers": config_data.get("configured_providers", []),
                         "default_provider": config_data.get("default_provider")
@@ -105,19 +236,18 @@ class V2ApiE2ETester:
                 "prompt_variant": test_case.get("prompt_variant", "default")
             }
             
-            self.log("DEBUG", "发送生成请求", payload)
+            if self.debug:
+                self.log("DEBUG", "发送生成请求", payload)
             
-            async with self.session.post(
-                f"{self.base_url}/problems/generate",
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            ) as response:
+            async with self._request("POST", "/problems/generate", json=payload) as response:
                 
-                response_text = await response.text()
-                self.log("DEBUG", f"响应状态: {response.status}, 内容: {response_text[:200]}")
+                # 只读取一次响应体
+                raw = await response.read()
+                if self.debug:
+                    self.log("DEBUG", f"响应状态: {response.status}, 内容: {raw[:200].decode('utf-8', 'replace')}")
                 
                 if response.status == 200:
-                    result = await response.json()
+                    result = json.loads(raw)
                     task_id = result.get("task_id")
                     
                     if task_id:
@@ -131,13 +261,112 @@ class V2ApiE2ETester:
                         self.log("ERROR", "响应中缺少task_id", result)
                         return None
                 else:
-                    self.log("ERROR", f"生成请求失败: {response.status} - {response_text}")
+                    self.log("ERROR", f"生成请求失败: {response.status} - {raw.decode('utf-8', 'replace')}")
                     return None
                     
         except Exception as e:
             self.log("ERROR", f"生成请求异常: {str(e)}")
             return None
     
+    def _finish_task(self, task_id: str, status_data: Dict[str, Any],
+                     start_time: float, poll_count: int) -> Dict[str, Any]:
+        """
+        记录任务的终止状态并构造最终结果
+        
+        Args:
+            task_id: 任务ID
+            status_data: 最后一次获取的任务数据
+            start_time: 开始等待的时间
+            poll_count: 获取状态的次数
+            
+        Returns:
+            Dict[str, Any]: 最终任务状态
+        """
+        current_status = status_data.get("status")
+        final_status = {
+            "status": current_status,
+            "data": status_data,
+            "total_time": time.time() - start_time,
+            "poll_count": poll_count
+        }
+        
+        if current_status == "completed":
+            self.log("SUCCESS", f"任务完成: {task_id}", {
+                "总耗时": f"{final_status['total_time']:.1f}秒",
+                "轮询次数": poll_count,
+                "最终进度": status_data.get("progress", 0)
+            })
+        else:
+            error_msg = status_data.get("error_message", "未知错误")
+            self.log("ERROR", f"任务失败: {task_id}", {
+                "错误信息": error_msg,
+                "总耗时": f"{final_status['total_time']:.1f}秒",
+                "轮询次数": poll_count
+            })
+        
+        return final_status
+    
+    async def stream_task_status(self, task_id: str, max_wait_time: int = 300) -> Dict[str, Any]:
+        """
+        通过WebSocket接收任务状态推送，服务端不支持时回退到轮询
+        
+        Args:
+            task_id: 任务ID
+            max_wait_time: 最大等待时间（秒）
+            
+        Returns:
+            Dict[str, Any]: 最终任务状态
+        """
+        # 状态推送依赖aiohttp的WebSocket客户端
+        if self.transport != "aiohttp":
+            return await self.poll_task_status(task_id, max_wait_time)
+        
+        start_time = time.time()
+        message_count = 0
+        last_status = None
+        
+        try:
+            async with self.session.ws_connect(f"{self.base_url}/tasks/{task_id}/ws") as ws:
+                self.log("INFO", f"📡 开始接收任务状态推送: {task_id}")
+                
+                while True:
+                    remaining = max_wait_time - (time.time() - start_time)
+                    if remaining <= 0:
+                        break
+                    
+                    msg = await ws.receive(timeout=remaining)
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    
+                    message_count += 1
+                    status_data = msg.json()
+                    current_status = status_data.get("status")
+                    
+                    if current_status != last_status:
+                        self.log("INFO", f"状态更新: {current_status} ({status_data.get('progress', 0)}%)")
+                        last_status = current_status
+                    
+                    if current_status in TERMINAL_STATUSES:
+                        return self._finish_task(task_id, status_data, start_time, message_count)
+        except aiohttp.WSServerHandshakeError as e:
+            self.log("INFO", f"服务端不支持状态推送 ({e.status})，改用轮询")
+        except asyncio.TimeoutError:
+            pass
+        except aiohttp.ClientError as e:
+            self.log("WARN", f"状态推送连接异常: {str(e)}，改用轮询")
+        
+        # 推送不可用或连接提前结束时，用剩余时间继续轮询
+        remaining = max_wait_time - (time.time() - start_time)
+        return await self.poll_task_status(task_id, max_wait_time=max(int(remaining), 0))
+    
+    @staticmethod
+    def _flush_lines(lines: list) -> None:
+        """一次性写出缓冲的输出行并清空缓冲"""
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+            lines.clear()
+    
     async def poll_task_status(self, task_id: str, max_wait_time: int = 300) -> Dict[str, Any]:
         """
         轮询任务状态直到完成或失败
@@ -154,64 +383,73 @@ class V2ApiE2ETester:
         start_time = time.time()
         poll_count = 0
         last_status = None
+        last_progress = None
+        idle_polls = 0
+        # 状态未变化时的轮询输出先缓冲，状态变化或累计一定行数后再写出
+        pending_lines = []
         
         while time.time() - start_time < max_wait_time:
             poll_count += 1
+            retry_after = None
             
             try:
-                async with self.session.get(f"{self.base_url}/tasks/{task_id}") as response:
+                async with self._request("GET", f"/tasks/{task_id}") as response:
+                    retry_after = response.headers.get("Retry-After")
+                    
                     if response.status == 200:
                         status_data = await response.json()
                         current_status = status_data.get("status")
                         progress = status_data.get("progress", 0)
                         
+                        # 状态或进度有变化时重置退避
+                        if current_status != last_status or progress != last_progress:
+                            idle_polls = 0
+                            last_progress = progress
+                        else:
+                            idle_polls += 1
+                        
                         # 只在状态变化时记录详细日志
                         if current_status != last_status:
-                            self.log("INFO", f"状态更新: {current_status} ({progress}%)", {
+                            self._flush_lines(pending_lines)
+                            details = {
                                 "task_id": task_id,
                                 "poll_count": poll_count,
                                 "elapsed_time": f"{time.time() - start_time:.1f}s"
-                            })
+                            } if self.debug else None
+                            self.log("INFO", f"状态更新: {current_status} ({progress}%)", details)
                             last_status = current_status
                         else:
                             # 简化日志，避免过多输出
-                            print(f"    ⏳ 轮询 #{poll_count}: {current_status} ({progress}%)")
+                            test_name = _current_test.get()
+                            tag = f"[{test_name}] " if test_name else ""
+                            pending_lines.append(f"    ⏳ {tag}轮询 #{poll_count}: {current_status} ({progress}%)")
+                            if len(pending_lines) >= POLL_OUTPUT_BATCH:
+                                self._flush_lines(pending_lines)
                         
                         # 检查终止条件
-                        if current_status in ["completed", "failed"]:
-                            final_status = {
-                                "status": current_status,
-                                "data": status_data,
-                                "total_time": time.time() - start_time,
-                                "poll_count": poll_count
-                            }
-                            
-                            if current_status == "completed":
-                                self.log("SUCCESS", f"任务完成: {task_id}", {
-                                    "总耗时": f"{final_status['total_time']:.1f}秒",
-                                    "轮询次数": poll_count,
-                                    "最终进度": progress
-                                })
-                            else:
-                                error_msg = status_data.get("error_message", "未知错误")
-                                self.log("ERROR", f"任务失败: {task_id}", {
-                                    "错误信息": error_msg,
-                                    "总耗时": f"{final_status['total_time']:.1f}秒",
-                                    "轮询次数": poll_count
-                                })
-                            
-                            return final_status
+                        if current_status in TERMINAL_STATUSES:
+                            return self._finish_task(task_id, status_data, start_time, poll_count)
                     else:
+                        idle_polls += 1
+                        self._flush_lines(pending_lines)
                         self.log("WARN", f"状态查询失败: {response.status}")
                         
             except Exception as e:
+                idle_polls += 1
+                self._flush_lines(pending_lines)
                 self.log("WARN", f"轮询异常: {str(e)}")
             
-            # 等待间隔（根据轮询次数调整）
-            wait_time = min(2 + poll_count * 0.1, 5)  # 2-5秒之间
+            # 等待间隔：优先遵循Retry-After，否则使用带抖动的指数退避
+            try:
+                wait_time = float(retry_after)
+            except (TypeError, ValueError):
+                wait_time = random.uniform(
+                    0.5, min(POLL_MAX_DELAY, POLL_BASE_DELAY * (1.5 ** idle_polls))
+                )
             await asyncio.sleep(wait_time)
         
         # 超时
+        self._flush_lines(pending_lines)
         self.log("ERROR", f"任务轮询超时: {task_id}", {
             "max_wait_time": max_wait_time,
             "total_polls": poll_count
@@ -323,7 +561,7 @@ class V2ApiE2ETester:
             self.log("INFO", "🔄 阶段2: 轮询任务状态")
             stage2_start = time.time()
             
-            poll_result = await self.poll_task_status(task_id, max_wait_time=test_case.get("timeout", 300))
+            poll_result = await self.stream_task_status(task_id, max_wait_time=test_case.get("timeout", 300))
             
             result["stages"]["polling"] = {
                 "success": poll_result["status"] == "completed",
@@ -412,23 +650,27 @@ class V2ApiE2ETester:
         test_cases = self.get_test_cases()
         self.log("INFO", f"📋 准备运行 {len(test_cases)} 个测试用例")
         
-        # 运行测试
-        for i, test_case in enumerate(test_cases, 1):
-            print(f"\n{'─' * 60}")
-            self.log("INFO", f"🔥 测试 {i}/{len(test_cases)}")
-            
-            test_result = await self.run_single_test(test_case)
-            self.test_results.append(test_result)
-            
-            # 简单的结果反馈
-            if test_result["success"]:
-                self.log("SUCCESS", f"测试通过 ({test_result['total_time']:.1f}s)")
-            else:
-                self.log("ERROR", f"测试失败: {test_result['error']}")
-            
-            # 测试间隔
-            if i < len(test_cases):
-                await asyncio.sleep(2)
+        # 运行测试（各用例互不依赖，限制并发数后同时执行）
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TESTS)
+        
+        async def run_bounded(i: int, test_case: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                _current_test.set(test_case["name"])
+                self.log("INFO", f"🔥 测试 {i}/{len(test_cases)}")
+                
+                test_result = await self.run_single_test(test_case)
+                
+                # 简单的结果反馈
+                if test_result["success"]:
+                    self.log("SUCCESS", f"测试通过 ({test_result['total_time']:.1f}s)")
+                else:
+                    self.log("ERROR", f"测试失败: {test_result['error']}")
+                
+                return test_result
+        
+        self.test_results = list(await asyncio.gather(
+            *(run_bounded(i, test_case) for i, test_case in enumerate(test_cases, 1))
+        ))
         
         # 生成测试报告
         await self.generate_report()
@@ -483,14 +725,22 @@ class V2ApiE2ETester:
             "test_results": self.test_results
         }
         
+        # 逐块编码写入，不在内存中生成完整的JSON字符串
+        encoder = json.JSONEncoder(ensure_ascii=False, indent=2)
         with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
+            f.writelines(encoder.iterencode(report_data))
         
         self.log("INFO", f"📄 详细报告已保存: {report_file}")
 
 async def main():
     """主函数"""
-    async with V2ApiE2ETester() as tester:
+    parser = argparse.ArgumentParser(description="V2 API E2E测试")
+    parser.add_argument("--transport", choices=["aiohttp", "httpx"], default="aiohttp",
+                        help="HTTP客户端实现")
+    parser.add_argument("--debug", action="store_true", help="输出DEBUG级别日志")
+    args = parser.parse_args()
+    
+    async with V2ApiE2ETester(debug=args.debug, transport=args.transport) as tester:
         await tester.run_all_tests()
 
 if __name__ == "__main__":
@@ -9,50 +9,148 @@ import matplotlib
 matplotlib.use('Agg')  # 使用无GUI后端
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.animation import FuncAnimation
 import numpy as np
 import re
 from PIL import Image, ImageDraw, ImageFont
 import os
+import functools
+import threading
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
 
+# 题目参数提取的正则表达式（预编译）
+# 距离与速度合并为一个模式，一次扫描即可提取相遇问题的全部参数
+_PARSE_RE = re.compile(
+    r'相距(?P<dist>\d+)公里(?P<dist_speed>/小时)?|(?P<prefix>速度为)?(?P<speed>\d+)公里/小时'
+)
+_ALL_SPEEDS_RE = re.compile(r'(\d+)公里/小时')
+
+def _synchronized(method):
+    """复用画布的绘图方法需要串行执行（同一实例可能被多个后台线程共享）"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class MathProblemVisualizer:
-    def __init__(self):
+    def __init__(self, dpi=150):
         self.fig_size = (12, 8)
+        self.dpi = dpi
         self.colors = {
             'car1': '#FF6B6B',  # 红色
             'car2': '#4ECDC4',  # 青色
             'road': '#95A5A6',  # 灰色
             'text': '#2C3E50'   # 深蓝色
         }
+        # 文字标注的背景框样式
+        self._bbox_info = dict(boxstyle="round,pad=0.3", facecolor='lightblue')
+        self._bbox_label = dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8)
+        self._bbox_time = dict(boxstyle="round,pad=0.3", facecolor='lightblue', alpha=0.8)
+        self._bbox_car1 = dict(boxstyle="round,pad=0.3", facecolor=self.colors['car1'], alpha=0.3)
+        self._bbox_car2 = dict(boxstyle="round,pad=0.3", facecolor=self.colors['car2'], alpha=0.3)
+        # 复用的画布，首次使用时创建；绘图时加锁避免多线程同时修改
+        # 画布不经过pyplot创建，不会成为pyplot的当前图形，避免与同进程内执行的绘图代码互相干扰
+        self._lock = threading.Lock()
+        self._fig_meeting = None
+        self._meeting_axes = None
+        self._fig_chase = None
+        self._chase_ax = None
+    
+    def _new_figure(self):
+        """创建不注册到pyplot的画布"""
+        fig = Figure(figsize=self.fig_size, dpi=self.dpi)
+        FigureCanvasAgg(fig)
+        return fig
+    
+    def _get_meeting_figure(self):
+        """获取相遇问题画布（复用已有画布并清空坐标轴）"""
+        if self._fig_meeting is None:
+            self._fig_meeting = self._new_figure()
+            self._meeting_axes = self._fig_meeting.subplots(2, 1)
+        for ax in self._meeting_axes:
+            ax.clear()
+        self._reset_layout(self._fig_meeting)
+        return self._fig_meeting, self._meeting_axes
+    
+    def _get_chase_figure(self):
+        """获取追及问题画布（复用已有画布并清空坐标轴）"""
+        if self._fig_chase is None:
+            self._fig_chase = self._new_figure()
+            self._chase_ax = self._fig_chase.subplots()
+        self._chase_ax.clear()
+        self._reset_layout(self._fig_chase)
+        return self._fig_chase, self._chase_ax
+    
+    @staticmethod
+    def _reset_layout(fig):
+        """恢复默认子图边距，保证复用画布时tight_layout的结果与新建画布一致"""
+        fig.subplots_adjust(**{
+            key: plt.rcParams[f'figure.subplot.{key}']
+            for key in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')
+        })
+    
+    def _save_figure(self, fig, output_path):
+        """保存图片：.jpg/.jpeg直接由渲染缓冲区编码为JPEG，其余格式交给savefig按扩展名处理"""
+        ext = os.path.splitext(os.fspath(output_path))[1].lower()
+        if ext not in ('.jpg', '.jpeg'):
+            fig.savefig(output_path, dpi=self.dpi, bbox_inches='tight')
+            return
+        
+        # 画布创建时已使用self.dpi，这里不修改figure的dpi，避免影响后续保存
+        fig.canvas.draw()
+        buf = np.asarray(fig.canvas.buffer_rgba())
+        Image.fromarray(buf).convert('RGB').save(
+            output_path, 'JPEG', quality=85, optimize=True, progressive=True
+        )
+    
+    def close(self):
+        """释放复用的画布"""
+        self._fig_meeting = self._meeting_axes = None
+        self._fig_chase = self._chase_ax = None
     
     def parse_meeting_problem(self, text):
         """解析相遇问题的参数"""
-        # 提取距离
-        distance_match = re.search(r'相距(\d+)公里', text)
-        distance = int(distance_match.group(1)) if distance_match else 480
-        
-        # 提取第一个速度
-        speed1_match = re.search(r'速度为(\d+)公里/小时', text)
-        speed1 = int(speed1_match.group(1)) if speed1_match else 60
-        
-        # 提取第二个速度
-        speeds = re.findall(r'(\d+)公里/小时', text)
-        speed2 = int(speeds[1]) if len(speeds) > 1 else 80
-        
-        return distance, speed1, speed2
+        distance = None
+        speed1 = None
+        speeds = []
+        
+        for match in _PARSE_RE.finditer(text):
+            if match.group('dist'):
+                # 距离取第一次出现的"相距X公里"
+                if distance is None:
+                    distance = int(match.group('dist'))
+                # "相距X公里/小时"中的X同时也计为一个速度
+                if match.group('dist_speed'):
+                    speeds.append(int(match.group('dist')))
+            else:
+                speed = int(match.group('speed'))
+                speeds.append(speed)
+                # 第一个速度取第一次出现的"速度为X公里/小时"
+                if speed1 is None and match.group('prefix'):
+                    speed1 = speed
+        
+        # 第二个速度取所有速度中的第二个
+        speed2 = speeds[1] if len(speeds) > 1 else 80
+        
+        return (distance if distance is not None else 480,
+                speed1 if speed1 is not None else 60,
+                speed2)
     
-    def create_meeting_visualization(self, text, output_path="output/meeting_problem.png"):
+    @_synchronized
+    def create_meeting_visualization(self, text, output_path="output/meeting_problem.jpg"):
         """生成相遇问题可视化图片"""
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
         distance, speed1, speed2 = self.parse_meeting_problem(text)
         
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=self.fig_size)
+        fig, (ax1, ax2) = self._get_meeting_figure()
         
         # 上图：场景示意图
         ax1.set_xlim(0, distance)
@@ -83,21 +181,23 @@ class MathProblemVisualizer:
                  fc=self.colors['car2'], ec=self.colors['car2'])
         
         ax1.text(distance/2, 2.5, f'总距离: {distance}km', ha='center', fontsize=14, 
-                bbox=dict(boxstyle="round,pad=0.3", facecolor='lightblue'))
+                bbox=self._bbox_info)
         
         ax1.set_xlabel('距离 (公里)', fontsize=12)
         ax1.legend(loc='upper right')
         ax1.grid(True, alpha=0.3)
         
         # 下图：位置-时间图
-        time_points = np.linspace(0, meeting_time * 1.2, 100)
-        pos1 = speed1 * time_points  # 车1的位置
-        pos2 = distance - speed2 * time_points  # 车2的位置
+        # 匀速运动的轨迹是直线，只需两个端点
+        time_points = np.array([0.0, meeting_time * 1.2])
+        positions = np.empty((len(time_points), 2))
+        positions[:, 0] = speed1 * time_points  # 车1的位置
+        positions[:, 1] = distance - speed2 * time_points  # 车2的位置
         
-        ax2.plot(pos1, time_points, color=self.colors['car1'], linewidth=3, 
-                label=f'车1轨迹 ({speed1}km/h)')
-        ax2.plot(pos2, time_points, color=self.colors['car2'], linewidth=3, 
-                label=f'车2轨迹 ({speed2}km/h)')
+        line1, line2 = ax2.plot(positions, time_points, linewidth=3, 
+                               label=[f'车1轨迹 ({speed1}km/h)', f'车2轨迹 ({speed2}km/h)'])
+        line1.set_color(self.colors['car1'])
+        line2.set_color(self.colors['car2'])
         
         # 标记相遇点
         ax2.plot(meeting_point, meeting_time, '*', markersize=15, color='gold')
@@ -108,13 +208,13 @@ class MathProblemVisualizer:
         ax2.text(meeting_point + distance*0.05, meeting_time, 
                 f'{meeting_time:.2f}h', ha='left', va='center', 
                 fontsize=12, fontweight='bold', color='red',
-                bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8))
+                bbox=self._bbox_label)
         
         # 添加位置标注
         ax2.text(meeting_point, meeting_time - meeting_time*0.1, 
                 f'{meeting_point:.0f}km', ha='center', va='top', 
                 fontsize=12, fontweight='bold', color='red',
-                bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8))
+                bbox=self._bbox_label)
         
         ax2.set_xlabel('位置 (公里)', fontsize=12)
         ax2.set_ylabel('时间 (小时)', fontsize=12)
@@ -124,9 +224,8 @@ class MathProblemVisualizer:
         ax2.set_xlim(0, distance)
         ax2.set_ylim(0, meeting_time * 1.2)
         
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        self._save_figure(fig, output_path)
         
         return output_path, {
             'meeting_time': meeting_time,
@@ -136,13 +235,14 @@ class MathProblemVisualizer:
             'speed2': speed2
         }
     
-    def create_chase_visualization(self, text, output_path="output/chase_problem.png"):
+    @_synchronized
+    def create_chase_visualization(self, text, output_path="output/chase_problem.jpg"):
         """生成追及问题可视化图片"""
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
         # 简化的追及问题参数提取
-        speeds = re.findall(r'(\d+)公里/小时', text)
+        speeds = _ALL_SPEEDS_RE.findall(text)
         speed1 = int(speeds[0]) if len(speeds) > 0 else 90  # 客车
         speed2 = int(speeds[1]) if len(speeds) > 1 else 60  # 货车初速度
         speed3 = int(speeds[2]) if len(speeds) > 2 else 75  # 货车加速后
@@ -158,7 +258,7 @@ class MathProblemVisualizer:
             chase_time = 10  # 设置一个合理的显示时间
             can_chase = False
         
-        fig, ax = plt.subplots(figsize=self.fig_size)
+        fig, ax = self._get_chase_figure()
         
         # 设置不同时间点进行展示
         if can_chase:
@@ -170,62 +270,58 @@ class MathProblemVisualizer:
         max_pos = max(speed1 * time_snapshots[-1], 
                      speed2 * lead_time + speed3 * (time_snapshots[-1] - lead_time)) * 1.1
         
-        # 绘制时间快照
-        for i, t in enumerate(time_snapshots):
-            y_pos = 3 - i * 0.7  # 从上往下排列
+        # 批量计算各时间快照下两车的位置
+        ts = np.asarray(time_snapshots, dtype=float)
+        pos1_arr = speed1 * ts
+        pos2_arr = np.where(ts <= lead_time, speed2 * ts,
+                            speed2 * lead_time + speed3 * (ts - lead_time))
+        y_arr = 3 - np.arange(len(ts)) * 0.7  # 从上往下排列
+        
+        # 绘制数轴和起点标记
+        ax.hlines(y_arr, 0, max_pos, colors='k', linewidth=1, alpha=0.3)
+        ax.plot(np.zeros_like(y_arr), y_arr, '|', markersize=10, color='black')
+        
+        # 绘制两车位置（每辆车一次scatter）
+        ax.scatter(pos1_arr, y_arr, marker='o', s=144, color=self.colors['car1'], 
+                   label='客车', zorder=3)
+        ax.scatter(pos2_arr, y_arr, marker='s', s=144, color=self.colors['car2'], 
+                   label='货车', zorder=3)
+        
+        # 逐个快照添加文字标注
+        for i, (t, pos1, pos2, y_pos) in enumerate(zip(ts, pos1_arr, pos2_arr, y_arr)):
+            stage_label = "货车未加速" if t <= lead_time else "货车已加速"
             
-            # 计算两车位置
-            if t <= lead_time:
-                pos1 = speed1 * t
-                pos2 = speed2 * t
-                stage_label = f"货车未加速"
-            else:
-                pos1 = speed1 * t
-                pos2 = speed2 * lead_time + speed3 * (t - lead_time)
-                stage_label = f"货车已加速"
-            
-            # 绘制数轴
-            ax.plot([0, max_pos], [y_pos, y_pos], 'k-', linewidth=1, alpha=0.3)
-            
-            # 标记起点
-            ax.plot(0, y_pos, '|', markersize=10, color='black')
             ax.text(-max_pos*0.05, y_pos, '起点', ha='right', va='center', fontsize=10)
             
             # 大字体显示时间
             ax.text(-max_pos*0.25, y_pos, f'T = {t:.1f}h', ha='center', va='center', 
                    fontsize=14, fontweight='bold', 
-                   bbox=dict(boxstyle="round,pad=0.3", facecolor='lightblue', alpha=0.8))
+                   bbox=self._bbox_time)
             
             # 小字体显示阶段状态
             ax.text(-max_pos*0.15, y_pos, stage_label, ha='right', va='center', 
                    fontsize=10, style='italic', color='gray')
             
-            # 绘制客车位置
-            ax.plot(pos1, y_pos, 'o', markersize=12, color=self.colors['car1'], 
-                   label='客车' if i == 0 else "")
+            # 两车位置标注
             ax.text(pos1, y_pos + 0.15, f'客车\n{pos1:.0f}km', ha='center', va='bottom', 
                    fontsize=9, color=self.colors['car1'], fontweight='bold')
-            
-            # 绘制货车位置
-            ax.plot(pos2, y_pos, 's', markersize=12, color=self.colors['car2'], 
-                   label='货车' if i == 0 else "")
             ax.text(pos2, y_pos - 0.15, f'货车\n{pos2:.0f}km', ha='center', va='top', 
                    fontsize=9, color=self.colors['car2'], fontweight='bold')
             
             # 如果是追及时刻，标记特殊
-            if can_chase and i == len(time_snapshots) - 1 and abs(pos1 - pos2) < 5:
-                ax.plot(pos1, y_pos, '*', markersize=20, color='gold')
+            if can_chase and i == len(ts) - 1 and abs(pos1 - pos2) < 5:
+                ax.plot(pos1, y_pos, '*', markersize=20, color='gold', zorder=4)
                 ax.text(pos1, y_pos + 0.35, '追及点!', ha='center', va='bottom', 
                        fontsize=12, fontweight='bold', color='red')
-            elif not can_chase and i == len(time_snapshots) - 1:
+            elif not can_chase and i == len(ts) - 1:
                 ax.text(max_pos * 0.5, y_pos + 0.35, '货车无法追上客车', ha='center', va='bottom', 
                        fontsize=12, fontweight='bold', color='red')
         
         # 绘制速度信息
         ax.text(max_pos * 0.7, 3.5, f'客车速度: {speed1} km/h (恒定)', 
-               fontsize=12, bbox=dict(boxstyle="round,pad=0.3", facecolor=self.colors['car1'], alpha=0.3))
+               fontsize=12, bbox=self._bbox_car1)
         ax.text(max_pos * 0.7, 3.2, f'货车速度: {speed2} km/h → {speed3} km/h', 
-               fontsize=12, bbox=dict(boxstyle="round,pad=0.3", facecolor=self.colors['car2'], alpha=0.3))
+               fontsize=12, bbox=self._bbox_car2)
         
         # 设置图表属性
         ax.set_xlim(-max_pos*0.3, max_pos)
@@ -245,12 +341,11 @@ class MathProblemVisualizer:
             ax.axvline(x=x, color='gray', linestyle=':', alpha=0.5)
             ax.text(x, -0.3, f'{x}km', ha='center', va='top', fontsize=10)
         
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        self._save_figure(fig, output_path)
         
         return output_path, {'chase_time': chase_time if can_chase else None, 
-                            'chase_point': pos1 if can_chase else None, 
+                            'chase_point': float(pos1_arr[-1]) if can_chase else None, 
                             'can_chase': can_chase}
 
 def main():